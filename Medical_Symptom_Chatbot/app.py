@@ -1,6 +1,8 @@
+import time
 import streamlit as st
-from pipeline import MedicalChatbot
-import pandas as pd
+from ui_components import (
+    CSS, HEADER_HTML, DISCLAIMER_HTML, EMERGENCY_WARNING_HTML, FEATURE_CARDS_HTML, EXAMPLE_QUESTIONS_MD
+)
 
 # Page configuration
 st.set_page_config(
@@ -11,249 +13,210 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
-<style>
-.main-header {
-    font-size: 2.5rem;
-    color: #1f77b4;
-    text-align: center;
-    margin-bottom: 2rem;
-}
-.disclaimer {
-    background-color: #fff3cd;
-    border-left: 5px solid #ffc107;
-    padding: 10px;
-    margin: 10px 0;
-    border-radius: 5px;
-}
-.emergency-warning {
-    background-color: #f8d7da;
-    border-left: 5px solid #dc3545;
-    padding: 10px;
-    margin: 10px 0;
-    border-radius: 5px;
-    font-weight: bold;
-}
-.chat-bubble {
-    background-color: #f0f2f6;
-    padding: 15px;
-    border-radius: 15px;
-    margin: 10px 0;
-    border-left: 4px solid #1f77b4;
-}
-.user-bubble {
-    background-color: #d1ecf1;
-    padding: 15px;
-    border-radius: 15px;
-    margin: 10px 0;
-    text-align: right;
-    border-right: 4px solid #17a2b8;
-}
-.database-info {
-    background-color: #e8f5e8;
-    border-left: 4px solid #28a745;
-    padding: 8px;
-    margin: 5px 0;
-    border-radius: 5px;
-    font-size: 0.8em;
-}
-.feature-card {
-    background-color: #f8f9fa;
-    padding: 15px;
-    border-radius: 10px;
-    margin: 10px 0;
-    border: 1px solid #dee2e6;
-}
-.quick-button {
-    width: 100%;
-    margin: 2px 0;
+st.markdown(CSS, unsafe_allow_html=True)
+
+@st.cache_resource(show_spinner="Loading medical database...")
+def get_chatbot():
+    """Build the chatbot once per server process and share it across sessions"""
+    # Imported here so pipeline's pandas/Gemini dependencies load on first use
+    from pipeline import MedicalChatbot
+    return MedicalChatbot()
+
+class UncachedReply(Exception):
+    """Carries a failed reply out of _entity_info so st.cache_data does not keep it"""
+
+@st.cache_data(ttl=86400, max_entries=2048, show_spinner=False)
+def _entity_info(kind, name):
+    from pipeline import ErrorReply
+    
+    chatbot = get_chatbot()
+    if kind == "condition":
+        response = chatbot.get_condition_info(name)
+    elif kind == "drug":
+        response = chatbot.get_drug_info(name)
+    else:
+        response = chatbot.get_symptom_info(name)
+    if isinstance(response, ErrorReply):
+        raise UncachedReply(response)
+    return response
+
+def entity_info(kind, name):
+    """Answer for a single condition/drug/symptom, cached per normalized name; failures are retried next time"""
+    try:
+        return _entity_info(kind, name.strip().lower())
+    except UncachedReply as e:
+        return str(e)
+
+@st.cache_data
+def _top_names(_df, col, fingerprint, n=6):
+    """First n names of a column; `fingerprint` stands in for the unhashed dataframe"""
+    return _df[col].head(n).tolist()
+
+def quick_names(data, data_type, columns):
+    """Names for the sidebar quick-search buttons, from the first column present"""
+    import pandas as pd  # already loaded by the chatbot
+    
+    df = data.get(data_type)
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return []
+    col = next((c for c in columns if c in df.columns), None)
+    if col is None:
+        return []
+    return _top_names(df, col, (data_type, len(df), df[col].iat[0]))
+
+SOURCE_CAPTIONS = {
+    "database": "📚 From Medical Database",
+    "ai": "🤖 AI Generated Response",
 }
-</style>
-""", unsafe_allow_html=True)
+
+def response_source(response):
+    """Whether an answer came from the database or AI, decided once when it is added"""
+    return "database" if response.endswith(st.session_state.chatbot.DATABASE_FOOTER) else "ai"
+
+def chunked(chunks, min_ms=80, min_chars=64):
+    """Coalesce streamed text into pieces of at least `min_chars` or `min_ms` worth of output"""
+    buffer, size, started = [], 0, time.monotonic()
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= min_chars or (time.monotonic() - started) * 1000 >= min_ms:
+            yield "".join(buffer)
+            buffer, size, started = [], 0, time.monotonic()
+    if buffer:
+        yield "".join(buffer)
+
+def render_message(message):
+    with st.chat_message(message["role"]):
+        if message["role"] == "assistant":
+            st.caption(SOURCE_CAPTIONS[message.get("source", "ai")])
+        st.markdown(message["content"])
 
 def main():
     # Header
-    st.markdown('<div class="main-header">🏥 Medical Information Assistant</div>', unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
     
     # Disclaimer
-    st.markdown("""
-    <div class="disclaimer">
-    ⚠️ <strong>Important Disclaimer:</strong> This application provides general medical information for educational purposes only. 
-    It is not a substitute for professional medical advice, diagnosis, or treatment. Always seek the advice of your physician or 
-    other qualified health provider with any questions you may have regarding a medical condition.
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(DISCLAIMER_HTML, unsafe_allow_html=True)
     
     # Emergency warning
-    st.markdown("""
-    <div class="emergency-warning">
-    🚨 For medical emergencies, call your local emergency number immediately! Do not rely on this application for emergency situations.
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(EMERGENCY_WARNING_HTML, unsafe_allow_html=True)
     
     # Initialize chatbot
     if 'chatbot' not in st.session_state:
-        with st.spinner("Loading medical database..."):
-            st.session_state.chatbot = MedicalChatbot()
-            st.session_state.messages = []
+        st.session_state.chatbot = get_chatbot()
+        st.session_state.messages = []
     
     # Sidebar
     with st.sidebar:
-        st.title("💊 Medical Assistant")
-        
-        st.markdown("### 🔍 Quick Search")
-        
-        # Quick access buttons for conditions
-        st.markdown("**🤒 Common Conditions**")
-        if 'conditions' in st.session_state.chatbot.data:
-            # Check if the dataframe exists and has data
-            df = st.session_state.chatbot.data['conditions']
-            if not df.empty and 'name' in df.columns:
-                conditions = df['name'].head(6).tolist()
-                for condition in conditions:
-                    if st.button(f"🩺 {condition}", key=f"cond_{condition}", use_container_width=True):
-                        st.session_state.user_input = f"Tell me about {condition}"
-        
-        # Quick access buttons for medications
-        st.markdown("**💊 Common Medications**")
-        if 'drugs' in st.session_state.chatbot.data:
-            df = st.session_state.chatbot.data['drugs']
-            if not df.empty:
-                # Use 'drug_name' column for the new structure
-                if 'drug_name' in df.columns:
-                    drugs = df['drug_name'].head(6).tolist()
-                elif 'name' in df.columns:  # Fallback to old structure
-                    drugs = df['name'].head(6).tolist()
-                else:
-                    drugs = []
-                
-                for drug in drugs:
-                    if st.button(f"💊 {drug}", key=f"drug_{drug}", use_container_width=True):
-                        st.session_state.user_input = f"Information about {drug} medication"
-        
-        # Quick access buttons for symptoms
-        st.markdown("**🔍 Common Symptoms**")
-        if 'symptoms' in st.session_state.chatbot.data:
-            df = st.session_state.chatbot.data['symptoms']
-            if not df.empty and 'name' in df.columns:
-                symptoms = df['name'].head(6).tolist()
-                for symptom in symptoms:
-                    if st.button(f"🔍 {symptom}", key=f"symptom_{symptom}", use_container_width=True):
-                        st.session_state.user_input = f"Tell me about {symptom} symptom"
-        
-        st.markdown("---")
-        if st.button("🗑️ Clear Chat History", use_container_width=True):
-            st.session_state.messages = []
-            st.rerun()
+        sidebar()
     
     # Main chat area
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.markdown("### 💬 Chat with Medical Assistant")
-        
-        # Display chat messages
-        for message in st.session_state.messages:
-            if message["role"] == "user":
-                st.markdown(f"""
-                <div class="user-bubble">
-                    <strong>You:</strong> {message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                # Check if response came from database or AI
-                if "---" in message["content"] and "*Information from medical database*" in message["content"]:
-                    source_indicator = "📚 From Medical Database"
-                    bubble_class = "database-info"
-                else:
-                    source_indicator = "🤖 AI Generated Response"
-                    bubble_class = "chat-bubble"
-                
-                st.markdown(f"""
-                <div class="{bubble_class}">
-                    {source_indicator}
-                </div>
-                <div class="chat-bubble">
-                    {message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-        
-        # User input
-        user_input = st.text_input(
-            "Ask about medications, conditions, symptoms, or general health:",
-            value=st.session_state.get('user_input', ''),
-            placeholder="e.g., Tell me about diabetes, side effects of ibuprofen, headache symptoms...",
-            key="user_input_widget"
-        )
-        
-        # Action buttons
-        col1_1, col1_2 = st.columns(2)
-        
-        with col1_1:
-            if st.button("🚀 Smart Analysis", type="primary", use_container_width=True):
-                if user_input.strip():
-                    # Add user message to chat
-                    st.session_state.messages.append({"role": "user", "content": user_input})
-                    
-                    # Generate response
-                    with st.spinner("🔍 Analyzing your query..."):
-                        response = st.session_state.chatbot.generate_smart_response(user_input)
-                    
-                    # Add assistant response to chat
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    
-                    # Clear input
-                    st.session_state.user_input = ""
-                    st.rerun()
-                else:
-                    st.warning("Please enter a question")
-        
-        with col1_2:
-            if st.button("🔄 New Conversation", use_container_width=True):
-                st.session_state.user_input = ""
-                st.rerun()
+        chat_panel()
     
     with col2:
-        st.markdown("### 📁 Data Categories")
-        
-        st.markdown("""
-        <div class="feature-card">
-        <strong>💊 Medications Database</strong><br>
-        Drug information, side effects, dosages, interactions
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="feature-card">
-        <strong>🩺 Conditions Database</strong><br>
-        Diseases, symptoms, treatments, prevention
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="feature-card">
-        <strong>🔍 Symptoms Database</strong><br>
-        Symptom analysis, possible causes, severity
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="feature-card">
-        <strong>💡 Solutions Database</strong><br>
-        First aid, home remedies, self-care
-        </div>
-        """, unsafe_allow_html=True)
+        info_panel()
+
+def on_quick_pick(kind, template):
+    """Queue the picked name as a question and reset the pills for the next pick"""
+    key = f"pills_{kind}"
+    name = st.session_state[key]
+    if name:
+        st.session_state.quick_pick = (kind, name, template.format(name))
+    st.session_state[key] = None
+
+def clear_chat():
+    st.session_state.messages = []
+
+def sidebar():
+    """Quick search; widget callbacks update session state ahead of the normal rerun"""
+    st.title("💊 Medical Assistant")
+    
+    st.markdown("### 🔍 Quick Search")
+    
+    data = st.session_state.chatbot.data
+    
+    # Quick access pills for conditions
+    st.pills(
+        "**🤒 Common Conditions**", quick_names(data, 'conditions', ('name',)),
+        format_func=lambda condition: f"🩺 {condition}", key="pills_condition",
+        on_change=on_quick_pick, args=("condition", "Tell me about {}")
+    )
+    
+    # Quick access pills for medications
+    # Use 'drug_name' column for the new structure, 'name' for the old one
+    st.pills(
+        "**💊 Common Medications**", quick_names(data, 'drugs', ('drug_name', 'name')),
+        format_func=lambda drug: f"💊 {drug}", key="pills_drug",
+        on_change=on_quick_pick, args=("drug", "Information about {} medication")
+    )
+    
+    # Quick access pills for symptoms
+    st.pills(
+        "**🔍 Common Symptoms**", quick_names(data, 'symptoms', ('name',)),
+        format_func=lambda symptom: f"🔍 {symptom}", key="pills_symptom",
+        on_change=on_quick_pick, args=("symptom", "Tell me about {} symptom")
+    )
+    
+    st.markdown("---")
+    st.button("🗑️ Clear Chat History", use_container_width=True, on_click=clear_chat)
+
+@st.fragment
+def chat_panel():
+    """Chat history and input; submitting a question reruns only this fragment"""
+    st.markdown("### 💬 Chat with Medical Assistant")
+    
+    # Display chat messages; new turns go in the same container so they stay above the input
+    history = st.container()
+    with history:
+        for message in st.session_state.messages:
+            render_message(message)
+    
+    # User input (typed, or picked from the sidebar quick search)
+    prompt = st.chat_input(
+        "Ask about medications, conditions, symptoms, or general health..."
+    ) or ''
+    quick_pick = st.session_state.pop('quick_pick', None)
+    if quick_pick and not prompt:
+        prompt = quick_pick[2]
+    else:
+        quick_pick = None
+    
+    if prompt.strip():
+        with history:
+            # Add user message to chat
+            message = {"role": "user", "content": prompt}
+            st.session_state.messages.append(message)
+            render_message(message)
         
-        st.markdown("---")
-        st.markdown("### 💡 Example Questions")
-        st.markdown("""
-        Try asking:
-        - *"What is diabetes?"*
-        - *"Side effects of aspirin"*
-        - *"Headache symptoms and causes"*
-        - *"Treatment for common cold"*
-        - *"Can I take ibuprofen with blood pressure meds?"*
-        """)
+            # Generate response; typed questions stream in as Gemini produces them
+            if quick_pick:
+                with st.spinner("🔍 Analyzing your query..."):
+                    response = entity_info(quick_pick[0], quick_pick[1])
+                message = {"role": "assistant", "content": response, "source": response_source(response)}
+                render_message(message)
+            else:
+                with st.chat_message("assistant"):
+                    caption = st.empty()
+                    caption.caption("🔍 Analyzing your query...")
+                    response = st.write_stream(chunked(st.session_state.chatbot.generate_smart_response_stream(prompt)))
+                    message = {"role": "assistant", "content": response, "source": response_source(response)}
+                    caption.caption(SOURCE_CAPTIONS[message["source"]])
+            
+            # Add assistant response to chat
+            st.session_state.messages.append(message)
+
+@st.fragment
+def info_panel():
+    """Static right-hand column; rendered as a fragment so chat input doesn't rebuild it"""
+    st.markdown("### 📁 Data Categories")
+    st.markdown(FEATURE_CARDS_HTML, unsafe_allow_html=True)
+    
+    st.markdown("---")
+    st.markdown("### 💡 Example Questions")
+    st.markdown(EXAMPLE_QUESTIONS_MD)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
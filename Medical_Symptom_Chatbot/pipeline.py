@@ -1,10 +1,24 @@
 import os
+import re
+import pickle
+import hashlib
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 
+try:
+    import simsimd  # optional SIMD similarity kernels
+except ImportError:
+    simsimd = None
+
 # Load environment variables
 load_dotenv()
 
@@ -18,21 +32,254 @@ genai.configure(api_key=GEMINI_API_KEY)
 # Models
 GEN_MODEL = genai.GenerativeModel("models/gemini-2.0-flash-lite")
 EMBED_MODEL = "models/text-embedding-004"
+# Maximum number of texts per embedding request, concurrent requests, and attempts when rate-limited
+EMBED_BATCH_SIZE = 100
+EMBED_WORKERS = 8
+EMBED_RETRIES = 5
+# On-disk cache of embeddings (keyed by a hash of model name and text) and generated answers
+CACHE_DB_PATH = Path("cache") / "chatbot_cache.sqlite"
+# Built semantic indexes, named by a fingerprint of the source CSVs
+INDEX_CACHE_DIR = Path("cache")
+INDEX_FORMAT_VERSION = 2  # bump when the pickled index metadata changes shape
+
+# Query classification keywords
+MEDICATION_KEYWORDS = ('medicine', 'medication', 'drug', 'pill', 'tablet', 'dose', 'dosage',
+                       'side effect', 'prescription', 'ibuprofen', 'aspirin', 'paracetamol')
+
+CONDITION_KEYWORDS = ('symptom', 'condition', 'disease', 'illness', 'diagnosis', 'treatment',
+                      'what is', 'have', 'suffering from', 'cancer', 'diabetes', 'asthma')
+
+SYMPTOM_KEYWORDS = ('pain', 'headache', 'fever', 'cough', 'nausea', 'vomiting', 'dizziness',
+                    'rash', 'swelling', 'bleeding', 'shortness of breath')
+
+# Every query keyword mapped to its category, compiled into one pattern so a query is scanned once.
+# The lookahead reports overlapping matches; longer keywords are tried first at each position.
+QUERY_TYPE_PRIORITY = ("medication", "condition", "symptom")
+KEYWORD_CATEGORIES = {}
+for _category, _keywords in zip(QUERY_TYPE_PRIORITY, (MEDICATION_KEYWORDS, CONDITION_KEYWORDS, SYMPTOM_KEYWORDS)):
+    for _keyword in _keywords:
+        KEYWORD_CATEGORIES.setdefault(_keyword, _category)
+QUERY_KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(KEYWORD_CATEGORIES, key=len, reverse=True)) + "))"
+)
+
+# Searchable text per data type: format template and the columns that fill it
+ROW_TEXT_TEMPLATES = {
+    'conditions': ("Condition: {} | Symptoms: {} | Treatment: {} | Prevention: {}",
+                   ('name', 'symptoms', 'treatment', 'prevention')),
+    'drugs': ("Drug: {} | Class: {} | Uses: {} | Side Effects: {} | Contraindications: {}",
+              ('drug_name', 'drug_class', 'uses', 'side_effects', 'contraindications')),
+    'symptoms': ("Symptom: {} | Possible Conditions: {} | Severity: {} | When to See Doctor: {}",
+                 ('name', 'possible_conditions', 'severity', 'when_to_see_doctor')),
+    'solutions': ("Problem: {} | Solution: {} | Steps: {} | Precautions: {}",
+                  ('problem', 'solution', 'steps', 'precautions')),
+}
+
+# Columns searched by name lookups, per data type; the first one is the primary name
+NAME_COLUMNS = {
+    'conditions': ('name',),
+    'drugs': ('drug_name', 'brand_names'),
+    'symptoms': ('name',),
+}
+
+# Phrases that precede the entity name in a query
+ENTITY_PREFIXES = ('about', 'information on', 'tell me about')
+
+# Semantic response cache: minimum cosine similarity for reusing an answer,
+# and words that flip a question's meaning without moving its embedding much
+RESPONSE_CACHE_THRESHOLD = 0.97
+NEGATION_WORDS = frozenset(('not', 'no', 'without', "don't", "can't", 'never'))
+# Answers kept per kind (oldest evicted first) and how long a generated answer may be reused
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+
+# Minimum cosine similarity for answering a general question straight from the database
+SEMANTIC_MATCH_THRESHOLD = 0.3
+
+# Gemini prompts per answer kind; {subject} is the condition, drug, symptom or question
+PROMPT_TEMPLATES = {
+    'condition': """
+Provide concise, accurate information about the medical condition: {subject}
+
+Structure with:
+- Brief description
+- Common symptoms
+- General treatment approaches
+- When to see a doctor
+
+Include safety disclaimers and emphasize consulting healthcare professionals.
+""",
+    'drug': """
+Provide concise, accurate information about the medication: {subject}
+
+Structure with:
+- Common uses
+- Typical dosage guidelines
+- Side effects
+- Precautions
+
+Include strong warnings to consult doctors before taking any medication.
+""",
+    'symptom': """
+Provide concise, accurate information about the symptom: {subject}
+
+Structure with:
+- Description
+- Possible causes
+- When to seek medical attention
+- General self-care tips
+
+Include emergency warnings for serious symptoms.
+""",
+    'general': """
+Answer this medical question: "{subject}"
+
+Provide accurate, helpful information with appropriate safety disclaimers.
+Always recommend consulting healthcare professionals for personal medical advice.
+""",
+}
+# Split once around {subject} so each call only splices the short variable part in
+PROMPT_PARTS = {kind: tuple(template.split("{subject}")) for kind, template in PROMPT_TEMPLATES.items()}
+
+
+def build_prompt(kind, subject):
+    """Gemini prompt of the given kind about one subject"""
+    head, tail = PROMPT_PARTS[kind]
+    return f"{head}{subject}{tail}"
+
+
+def similarity_scores(matrix, query):
+    """Inner products of a query with each row; cosine scores when both are L2-normalized"""
+    if simsimd is not None:
+        try:
+            return np.asarray(simsimd.cdist(query[None, :], matrix, metric="inner"))[0]
+        except (TypeError, ValueError):
+            # Supported dtype/metric combinations vary across simsimd releases
+            pass
+    if matrix.dtype == np.int8:
+        # Only reached if simsimd fails after passing simsimd_int8_inner(); widen so products can't overflow
+        return matrix.astype(np.int32) @ query.astype(np.int32)
+    return matrix @ query
+
+
+def simsimd_int8_inner():
+    """Whether the installed simsimd computes int8 inner products; NumPy has no fast int8 matmul"""
+    if simsimd is None:
+        return False
+    probe = np.ones((1, 8), dtype=np.int8)
+    try:
+        return float(np.asarray(simsimd.cdist(probe, probe, metric="inner"))[0][0]) == 8
+    except (TypeError, ValueError):
+        return False
+
+
+def quantize_rows(matrix):
+    """Symmetric per-row int8 quantization: returns (int8 matrix, float32 scale per row)"""
+    if matrix.size == 0:
+        return np.empty(matrix.shape, dtype=np.int8), np.empty(len(matrix), dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def top_k_indices(scores, top_k):
+    """Indices of the top_k highest scores, best first, without sorting the whole array"""
+    if top_k >= len(scores):
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, top_k)[:top_k]
+    return part[np.argsort(-scores[part])]
+
+
+class ResponseCache:
+    """Bounded store of (query embedding, answer) pairs for one kind; when full the oldest entry is overwritten"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.vectors = None
+        self.created = None
+        self.responses = []
+        self.next_slot = 0
+
+    def add(self, vector, response, created):
+        size = len(self.responses)
+        if self.vectors is None:
+            self.vectors = np.empty((min(64, self.capacity), len(vector)), dtype=np.float32)
+            self.created = np.empty(len(self.vectors))
+        elif size == len(self.vectors) < self.capacity:
+            # Grow geometrically up to capacity so inserts stay amortized O(1)
+            new_size = min(2 * size, self.capacity)
+            self.vectors = np.resize(self.vectors, (new_size, self.vectors.shape[1]))
+            self.created = np.resize(self.created, new_size)
+        
+        slot = size if size < self.capacity else self.next_slot
+        if slot == size:
+            self.responses.append(response)
+        else:
+            self.responses[slot] = response
+        self.vectors[slot] = vector
+        self.created[slot] = created
+        self.next_slot = (slot + 1) % self.capacity
+
+    def lookup(self, query, threshold, oldest):
+        """Closest answer scoring at least `threshold` among entries created at or after `oldest`"""
+        size = len(self.responses)
+        if not size:
+            return None
+        scores = similarity_scores(self.vectors[:size], query)
+        scores = np.where(self.created[:size] >= oldest, scores, -np.inf)
+        best = int(np.argmax(scores))
+        return self.responses[best] if scores[best] >= threshold else None
+
+
+class ErrorReply(str):
+    """Reply text shown in place of an answer that could not be generated"""
 
 
 class MedicalChatbot:
+    # Appended to every answer formatted from the local database
+    DATABASE_FOOTER = "---\n*Information from medical database*"
+
     def __init__(self, data_path="data"):
         self.data_path = data_path
-        self.data = self.load_csv_data()
-        self.index = self.build_semantic_index()
+        # Gemini requests currently in flight, keyed by prompt
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        # Persistent embedding and response cache
+        self._cache_db = self.open_cache_db()
+        self._cache_db_lock = threading.Lock()
+        # Semantic response cache: kind -> ResponseCache
+        self._response_cache = self.load_response_cache()
+        self._response_cache_lock = threading.Lock()
+        self.data = self.load_data()
+        self.name_lookups = self.build_name_lookups()
+        # Semantic index, kept as one contiguous embedding matrix with parallel metadata lists.
+        # Rows are saved as int8 with a per-row scale. simsimd scans them directly (a quarter of the
+        # bytes per query); without it they are dequantized to unit float32 rows once, for BLAS matmul.
+        (self.embeddings_i8, self.scales, self.norms,
+         self.types, self.texts, self.positions) = self.load_semantic_index()
+        self.int8_search = simsimd_int8_inner()
+        if self.int8_search:
+            self.search_matrix = self.embeddings_i8
+        else:
+            self.search_matrix = (self.embeddings_i8 * (self.scales / self.norms)[:, None]).astype(np.float32)
 
     # -------------------------------
     # LOAD CSV DATA
     # -------------------------------
-    def load_csv_data(self):
+    def load_data(self):
+        """Load the CSV tables from data_path, or from the first folder beneath it that holds them"""
+        base_path = Path(self.data_path)
+        csv_dirs = sorted({path.parent for path in base_path.rglob("*.csv")})
+        if not csv_dirs:
+            if any(base_path.rglob("*.json")):
+                print(f"Warning: {base_path} only contains JSON files; the chatbot loads CSV tables")
+            return {}
+        return self.load_csv_data(base_path if base_path in csv_dirs else csv_dirs[0])
+
+    def load_csv_data(self, base_path=None):
         data = {}
         try:
-            base_path = Path(self.data_path)
+            base_path = Path(base_path or self.data_path)
             
             # Load conditions data
             conditions_path = base_path / "conditions.csv"
@@ -71,117 +318,265 @@ class MedicalChatbot:
     # -------------------------------
     # BUILD SEMANTIC INDEX FROM CSV
     # -------------------------------
+    def index_fingerprint(self):
+        """Hash of the index layout, source CSVs (path, size, mtime), embedding model and text templates"""
+        digest = hashlib.sha256(f"{INDEX_FORMAT_VERSION}|{EMBED_MODEL}|{ROW_TEXT_TEMPLATES!r}".encode())
+        for path in sorted(Path(self.data_path).rglob("*.csv")):
+            stat = path.stat()
+            digest.update(f"|{path}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def load_semantic_index(self):
+        """Return (embeddings_i8, scales, norms, types, texts, positions), reusing a saved index if the CSVs are unchanged"""
+        fingerprint = self.index_fingerprint()
+        matrix_path = INDEX_CACHE_DIR / f"index-{fingerprint}.npy"
+        meta_path = INDEX_CACHE_DIR / f"index-{fingerprint}.pkl"
+        
+        if matrix_path.exists() and meta_path.exists():
+            try:
+                with open(meta_path, "rb") as f:
+                    scales, norms, types, texts, positions = pickle.load(f)
+                # Read-only mapping: pages are loaded on demand and shared between processes
+                return np.load(matrix_path, mmap_mode="r"), scales, norms, types, texts, positions
+            except Exception as e:
+                print(f"Ignoring unreadable index cache: {e}")
+        
+        embeddings, types, texts, positions = self.build_semantic_index()
+        embeddings_i8, scales = quantize_rows(embeddings)
+        # Norms of the dequantized rows, computed once instead of per query
+        norms = np.linalg.norm(embeddings_i8 * scales[:, None], axis=1)
+        
+        if types:
+            try:
+                INDEX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                with open(meta_path, "wb") as f:
+                    pickle.dump((scales, norms, types, texts, positions), f)
+                np.save(matrix_path, embeddings_i8)
+                self.remove_stale_indexes(fingerprint)
+            except Exception as e:
+                print(f"Could not save index cache: {e}")
+        return embeddings_i8, scales, norms, types, texts, positions
+
+    def remove_stale_indexes(self, fingerprint):
+        """Delete saved indexes built from earlier versions of the CSVs"""
+        for path in INDEX_CACHE_DIR.glob("index-*"):
+            if path.suffix in (".npy", ".pkl") and path.stem != f"index-{fingerprint}":
+                try:
+                    path.unlink()
+                except OSError as e:
+                    # e.g. still memory-mapped by another process on Windows
+                    print(f"Could not remove stale index {path.name}: {e}")
+
     def build_semantic_index(self):
-        index = []
+        """Return (embeddings, types, texts, positions): an L2-normalized float32 matrix plus parallel metadata lists;
+        a row's full record stays in self.data and is looked up by (type, position) only when returned"""
+        types, texts, positions = [], [], []
         try:
             for data_type, df in self.data.items():
                 if isinstance(df, pd.DataFrame):
-                    for _, row in df.iterrows():
-                        # Convert row to searchable text
-                        text = self.row_to_text(row, data_type)
-                        if text:
-                            embedding_data = genai.embed_content(model=EMBED_MODEL, content=text)
-                            embedding = embedding_data["embedding"]
-                            index.append({
-                                "type": data_type,
-                                "data": row.to_dict(),
-                                "text": text,
-                                "embedding": embedding
-                            })
-            return index
+                    # Convert rows to searchable text
+                    df_texts = self.rows_to_texts(df, data_type)
+                    types.extend([data_type] * len(df_texts))
+                    texts.extend(df_texts)
+                    positions.extend(range(len(df_texts)))
+            
+            if not texts:
+                return np.empty((0, 0), dtype=np.float32), [], [], []
+            embeddings = self.embed_texts(texts)
         except Exception as e:
             print(f"Error building index: {e}")
-            return []
+            return np.empty((0, 0), dtype=np.float32), [], [], []
+        
+        return embeddings, types, texts, positions
 
     # -------------------------------
-    # CONVERT CSV ROW TO SEARCHABLE TEXT
+    # EMBEDDINGS WITH PERSISTENT CACHE
     # -------------------------------
-    def row_to_text(self, row, data_type):
+    def open_cache_db(self):
         try:
-            if data_type == 'conditions':
-                return f"Condition: {row.get('name', '')} | Symptoms: {row.get('symptoms', '')} | Treatment: {row.get('treatment', '')} | Prevention: {row.get('prevention', '')}"
-            
-            elif data_type == 'drugs':
-                return f"Drug: {row.get('drug_name', '')} | Class: {row.get('drug_class', '')} | Uses: {row.get('uses', '')} | Side Effects: {row.get('side_effects', '')} | Contraindications: {row.get('contraindications', '')}"
-            
-            elif data_type == 'symptoms':
-                return f"Symptom: {row.get('name', '')} | Possible Conditions: {row.get('possible_conditions', '')} | Severity: {row.get('severity', '')} | When to See Doctor: {row.get('when_to_see_doctor', '')}"
-            
-            elif data_type == 'solutions':
-                return f"Problem: {row.get('problem', '')} | Solution: {row.get('solution', '')} | Steps: {row.get('steps', '')} | Precautions: {row.get('precautions', '')}"
-            
-            return str(row.to_dict())
+            CACHE_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB)")
+            db.execute("CREATE TABLE IF NOT EXISTS responses "
+                       "(model TEXT, kind TEXT, vec BLOB, response TEXT, created REAL NOT NULL DEFAULT 0)")
+            if "created" not in [column[1] for column in db.execute("PRAGMA table_info(responses)")]:
+                # Caches from before expiry existed: their rows count as expired
+                db.execute("ALTER TABLE responses ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            db.commit()
+            return db
         except Exception as e:
-            return str(row.to_dict())
+            print(f"Cache disabled: {e}")
+            return None
+
+    def cached_embeddings(self, keys):
+        if self._cache_db is None or not keys:
+            return {}
+        found = {}
+        with self._cache_db_lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, vec in self._cache_db.execute(
+                        f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})", chunk):
+                    found[key] = np.frombuffer(vec, dtype=np.float32)
+        return found
+
+    def store_embeddings(self, vectors):
+        if self._cache_db is None or not vectors:
+            return
+        try:
+            with self._cache_db_lock:
+                self._cache_db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                                           [(key, vec.tobytes()) for key, vec in vectors.items()])
+                self._cache_db.commit()
+        except Exception as e:
+            print(f"Embedding cache write error: {e}")
+
+    def embed_texts(self, texts):
+        """Embed texts as rows of an L2-normalized float32 matrix, only calling Gemini for uncached texts"""
+        keys = [hashlib.sha256(f"{EMBED_MODEL}|{text}".encode()).hexdigest() for text in texts]
+        vectors = self.cached_embeddings(list(set(keys)))
+        missing = list({key: text for key, text in zip(keys, texts) if key not in vectors}.items())
+        
+        # Embed in batches: one request per EMBED_BATCH_SIZE texts instead of one per text,
+        # with several batches in flight at once since the work is network-bound
+        batches = [[text for _, text in missing[start:start + EMBED_BATCH_SIZE]]
+                   for start in range(0, len(missing), EMBED_BATCH_SIZE)]
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as executor:
+                results = list(executor.map(self.embed_batch, batches))
+        else:
+            results = [self.embed_batch(batch) for batch in batches]
+        
+        new = {}
+        for (key, _), embedding in zip(missing, (e for result in results for e in result)):
+            embedding = np.asarray(embedding, dtype=np.float32)
+            new[key] = embedding / np.linalg.norm(embedding)
+        vectors.update(new)
+        self.store_embeddings(new)
+        
+        return np.stack([vectors[key] for key in keys])
+
+    def embed_batch(self, texts):
+        """One embedding request, retried with exponential backoff when rate-limited"""
+        for attempt in range(EMBED_RETRIES):
+            try:
+                return genai.embed_content(model=EMBED_MODEL, content=texts)["embedding"]
+            except google_exceptions.ResourceExhausted:
+                if attempt == EMBED_RETRIES - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    @lru_cache(maxsize=1024)
+    def embed_text(self, text):
+        """Normalized embedding of a single text; repeated queries skip both disk and network"""
+        embedding = self.embed_texts([text])[0]
+        embedding.setflags(write=False)
+        return embedding
+
+    # -------------------------------
+    # CONVERT CSV ROWS TO SEARCHABLE TEXT
+    # -------------------------------
+    def rows_to_texts(self, df, data_type):
+        """Searchable text for every row, built from column arrays rather than per-row Series"""
+        if data_type not in ROW_TEXT_TEMPLATES:
+            return [str(record) for record in df.to_dict('records')]
+        template, columns = ROW_TEXT_TEMPLATES[data_type]
+        values = [df[col].to_numpy() if col in df.columns else [''] * len(df) for col in columns]
+        return [template.format(*row) for row in zip(*values)]
 
     # -------------------------------
     # SEMANTIC SEARCH
     # -------------------------------
     def semantic_search(self, query, top_k=5):
         try:
-            if not self.index:
+            if not self.types:
                 return []
-                
-            q_embed = genai.embed_content(model=EMBED_MODEL, content=query)["embedding"]
-            scored = []
-            for item in self.index:
-                score = np.dot(q_embed, item["embedding"]) / (
-                    np.linalg.norm(q_embed) * np.linalg.norm(item["embedding"])
-                )
-                scored.append((score, item))
-            scored.sort(key=lambda x: x[0], reverse=True)
-            return [s[1] for s in scored[:top_k]]
+            
+            # Rescaled int8 inner products over precomputed norms: cosine scores of the quantized vectors
+            q_i8, q_scale = quantize_rows(self.embed_text(query)[None, :])
+            q_norm = np.linalg.norm(q_i8[0] * q_scale[0])
+            if self.int8_search:
+                scores = similarity_scores(self.search_matrix, q_i8[0]) * (self.scales / self.norms) * (q_scale[0] / q_norm)
+            else:
+                scores = similarity_scores(self.search_matrix, q_i8[0] * (q_scale[0] / q_norm))
+            top_idx = top_k_indices(scores, top_k)
+            return [{"score": float(scores[i]), "type": self.types[i],
+                     "data": self.resolve_row(self.types[i], self.positions[i]), "text": self.texts[i]}
+                    for i in top_idx]
         except Exception as e:
             print(f"Semantic search error: {e}")
             return []
 
+    def resolve_row(self, data_type, position):
+        """Fetch one indexed record from the loaded tables by its row position"""
+        return self.data[data_type].iloc[position].to_dict()
+
     # -------------------------------
     # GET SPECIFIC DATA FROM CSV
     # -------------------------------
-    def get_condition_info(self, condition_name):
+    def build_name_lookups(self):
+        """Per data type: (exact lowercase name -> row position, lowercased searchable columns)"""
+        lookups = {}
+        for data_type, columns in NAME_COLUMNS.items():
+            df = self.data.get(data_type)
+            if not isinstance(df, pd.DataFrame) or columns[0] not in df.columns:
+                continue
+            lowered = [df[col].str.lower() for col in columns if col in df.columns]
+            exact = {}
+            for col in lowered:
+                for position, value in enumerate(col):
+                    if isinstance(value, str):
+                        # Brand names are comma-separated lists; index each one
+                        for name in value.split(","):
+                            exact.setdefault(name.strip(), position)
+            lookups[data_type] = (exact, lowered)
+        return lookups
+
+    def find_row(self, data_type, name):
+        """Row for `name`: exact match first, then the first substring match in any searchable column"""
+        if data_type not in self.name_lookups:
+            return None
+        exact, lowered = self.name_lookups[data_type]
+        name_lower = name.lower()
+        position = exact.get(name_lower)
+        if position is None:
+            match = np.zeros(len(lowered[0]), dtype=bool)
+            for col in lowered:
+                match |= col.str.contains(name_lower, na=False, regex=False).to_numpy()
+            hits = np.flatnonzero(match)
+            if not len(hits):
+                return None
+            position = hits[0]
+        return self.data[data_type].iloc[position]
+
+    def get_condition_info(self, condition_name, stream=False):
         """Get condition information from CSV data"""
-        if 'conditions' in self.data:
-            df = self.data['conditions']
-            condition_lower = condition_name.lower()
-            match = df[df['name'].str.lower().str.contains(condition_lower, na=False)]
-            if not match.empty:
-                row = match.iloc[0]
-                return self.format_condition_response(row)
+        row = self.find_row('conditions', condition_name)
+        if row is not None:
+            return self.format_condition_response(row)
         
         # Fallback to Gemini if not found in CSV
-        return self.generate_condition_info(condition_name)
+        return self.generate_condition_info(condition_name, stream)
 
-    def get_drug_info(self, drug_name):
-        """Get drug information from CSV data with new column structure"""
-        if 'drugs' in self.data:
-            df = self.data['drugs']
-            drug_lower = drug_name.lower()
-            
-            # Search in both drug_name and brand_names columns
-            match = df[
-                df['drug_name'].str.lower().str.contains(drug_lower, na=False) |
-                df['brand_names'].str.lower().str.contains(drug_lower, na=False)
-            ]
-            
-            if not match.empty:
-                row = match.iloc[0]
-                return self.format_drug_response(row)
+    def get_drug_info(self, drug_name, stream=False):
+        """Get drug information from CSV data, searching both drug_name and brand_names"""
+        row = self.find_row('drugs', drug_name)
+        if row is not None:
+            return self.format_drug_response(row)
         
         # Fallback to Gemini if not found in CSV
-        return self.generate_drug_info(drug_name)
+        return self.generate_drug_info(drug_name, stream)
 
-    def get_symptom_info(self, symptom_name):
+    def get_symptom_info(self, symptom_name, stream=False):
         """Get symptom information from CSV data"""
-        if 'symptoms' in self.data:
-            df = self.data['symptoms']
-            symptom_lower = symptom_name.lower()
-            match = df[df['name'].str.lower().str.contains(symptom_lower, na=False)]
-            if not match.empty:
-                row = match.iloc[0]
-                return self.format_symptom_response(row)
+        row = self.find_row('symptoms', symptom_name)
+        if row is not None:
+            return self.format_symptom_response(row)
         
         # Fallback to Gemini
-        return self.generate_symptom_info(symptom_name)
+        return self.generate_symptom_info(symptom_name, stream)
 
     # -------------------------------
     # FORMAT RESPONSES FROM CSV DATA
@@ -193,7 +588,7 @@ class MedicalChatbot:
         response += f"**Treatment Options:** {row.get('treatment', 'N/A')}\n\n"
         response += f"**Prevention:** {row.get('prevention', 'N/A')}\n\n"
         response += f"**When to See a Doctor:** {row.get('when_to_see_doctor', 'N/A')}\n\n"
-        response += "---\n*Information from medical database*"
+        response += self.DATABASE_FOOTER
         return response
 
     def format_drug_response(self, row):
@@ -205,7 +600,7 @@ class MedicalChatbot:
         response += f"**Important Precautions:** {row.get('precautions', 'N/A')}\n\n"
         response += f"**Available Forms:** {row.get('dosage_forms', 'N/A')}\n\n"
         response += f"**Brand Names:** {row.get('brand_names', 'N/A')}\n\n"
-        response += "---\n*Information from medical database*"
+        response += self.DATABASE_FOOTER
         return response
 
     def format_symptom_response(self, row):
@@ -214,115 +609,230 @@ class MedicalChatbot:
         response += f"**Possible Conditions:** {row.get('possible_conditions', 'N/A')}\n\n"
         response += f"**Severity Level:** {row.get('severity', 'N/A')}\n\n"
         response += f"**When to Seek Help:** {row.get('when_to_see_doctor', 'N/A')}\n\n"
-        response += "---\n*Information from medical database*"
+        response += self.DATABASE_FOOTER
         return response
 
     # -------------------------------
     # GENERATE FALLBACK RESPONSES USING GEMINI
     # -------------------------------
-    def generate_condition_info(self, condition_name):
-        try:
-            prompt = f"""
-Provide concise, accurate information about the medical condition: {condition_name}
+    def generate_condition_info(self, condition_name, stream=False):
+        prompt = build_prompt("condition", condition_name)
+        return self.llm_answer("condition", condition_name, prompt, f"Could not find information about {condition_name}.",
+                               "Error retrieving condition information", stream)
 
-Structure with:
-- Brief description
-- Common symptoms
-- General treatment approaches
-- When to see a doctor
+    def generate_drug_info(self, drug_name, stream=False):
+        prompt = build_prompt("drug", drug_name)
+        return self.llm_answer("drug", drug_name, prompt, f"Could not find information about {drug_name}.",
+                               "Error retrieving drug information", stream)
 
-Include safety disclaimers and emphasize consulting healthcare professionals.
-"""
+    def generate_symptom_info(self, symptom_name, stream=False):
+        prompt = build_prompt("symptom", symptom_name)
+        return self.llm_answer("symptom", symptom_name, prompt, f"Could not find information about {symptom_name}.",
+                               "Error retrieving symptom information", stream)
+
+    def claim_inflight(self, prompt):
+        """Return (future, owner): the owner makes the Gemini call, everyone else waits on its future"""
+        with self._inflight_lock:
+            future = self._inflight.get(prompt)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[prompt] = future
+        return future, owner
+
+    def generate_text(self, prompt):
+        """Call Gemini; concurrent identical prompts share one in-flight request"""
+        future, owner = self.claim_inflight(prompt)
+        if not owner:
+            return future.result()
+        
+        try:
             response = GEN_MODEL.generate_content(prompt)
-            return response.text.strip() if response and response.text else f"Could not find information about {condition_name}."
+            text = response.text.strip() if response and response.text else None
+            future.set_result(text)
+            return text
         except Exception as e:
-            return f"Error retrieving condition information: {e}"
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[prompt]
 
-    def generate_drug_info(self, drug_name):
+    def generate_text_stream(self, prompt):
+        """Streaming generate_text: the first caller streams, concurrent identical prompts get the full text at once"""
+        future, owner = self.claim_inflight(prompt)
+        if not owner:
+            text = future.result()
+            if text:
+                yield text
+            return
+        
+        parts = []
         try:
-            prompt = f"""
-Provide concise, accurate information about the medication: {drug_name}
+            for chunk in GEN_MODEL.generate_content(prompt, stream=True):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+            future.set_result("".join(parts).strip() or None)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            # A consumer that stops reading early must not leave waiters blocked
+            if not future.done():
+                future.set_exception(RuntimeError("Gemini stream was abandoned"))
+            with self._inflight_lock:
+                del self._inflight[prompt]
 
-Structure with:
-- Common uses
-- Typical dosage guidelines
-- Side effects
-- Precautions
+    # -------------------------------
+    # SEMANTIC RESPONSE CACHE
+    # -------------------------------
+    def cached_lookup(self, kind, query):
+        """Return (query embedding, cached answer or None); the embedding is None when caching is skipped"""
+        if NEGATION_WORDS.intersection(query.lower().split()):
+            return None, None
+        
+        try:
+            q_embed = self.embed_text(query)
+        except Exception as e:
+            print(f"Response cache embedding error: {e}")
+            return None, None
+        
+        with self._response_cache_lock:
+            cache = self._response_cache.get(kind)
+            cached = cache and cache.lookup(q_embed, RESPONSE_CACHE_THRESHOLD, time.time() - RESPONSE_CACHE_TTL)
+        return q_embed, cached
 
-Include strong warnings to consult doctors before taking any medication.
-"""
-            response = GEN_MODEL.generate_content(prompt)
-            return response.text.strip() if response and response.text else f"Could not find information about {drug_name}."
+    def cache_store(self, kind, q_embed, text):
+        if q_embed is None or not text:
+            return
+        created = time.time()
+        with self._response_cache_lock:
+            cache = self._response_cache.setdefault(kind, ResponseCache(RESPONSE_CACHE_MAX_ENTRIES))
+            cache.add(q_embed, text, created)
+        
+        if self._cache_db is None:
+            return
+        try:
+            with self._cache_db_lock:
+                self._cache_db.execute(
+                    "INSERT INTO responses (model, kind, vec, response, created) VALUES (?, ?, ?, ?, ?)",
+                    (EMBED_MODEL, kind, q_embed.tobytes(), text, created),
+                )
+                self.prune_responses(kind, created)
+                self._cache_db.commit()
         except Exception as e:
-            return f"Error retrieving drug information: {e}"
+            print(f"Response cache write error: {e}")
+
+    def prune_responses(self, kind, now):
+        """Drop expired answers of one kind and all but the newest ones; the caller holds the db lock"""
+        self._cache_db.execute(
+            "DELETE FROM responses WHERE model = ? AND kind = ? AND (created < ? OR rowid NOT IN "
+            "(SELECT rowid FROM responses WHERE model = ? AND kind = ? ORDER BY rowid DESC LIMIT ?))",
+            (EMBED_MODEL, kind, now - RESPONSE_CACHE_TTL, EMBED_MODEL, kind, RESPONSE_CACHE_MAX_ENTRIES),
+        )
 
-    def generate_symptom_info(self, symptom_name):
+    def load_response_cache(self):
+        """Rebuild the in-memory response cache from answers saved by earlier runs"""
+        if self._cache_db is None:
+            return {}
+        now = time.time()
         try:
-            prompt = f"""
-Provide concise, accurate information about the symptom: {symptom_name}
+            with self._cache_db_lock:
+                self._cache_db.execute("DELETE FROM responses WHERE created < ?", (now - RESPONSE_CACHE_TTL,))
+                kinds = [kind for (kind,) in self._cache_db.execute(
+                    "SELECT DISTINCT kind FROM responses WHERE model = ?", (EMBED_MODEL,))]
+                for kind in kinds:
+                    self.prune_responses(kind, now)
+                self._cache_db.commit()
+                rows = self._cache_db.execute(
+                    "SELECT kind, vec, response, created FROM responses WHERE model = ? ORDER BY rowid", (EMBED_MODEL,)
+                ).fetchall()
+        except Exception as e:
+            print(f"Response cache read error: {e}")
+            return {}
+        caches = {}
+        for kind, vec, response, created in rows:
+            cache = caches.setdefault(kind, ResponseCache(RESPONSE_CACHE_MAX_ENTRIES))
+            cache.add(np.frombuffer(vec, dtype=np.float32), response, created)
+        return caches
 
-Structure with:
-- Description
-- Possible causes
-- When to seek medical attention
-- General self-care tips
+    def cached_generate(self, kind, query, prompt):
+        """Generate text for `query`, reusing the answer to a near-identical earlier query of the same kind"""
+        q_embed, cached = self.cached_lookup(kind, query)
+        if cached:
+            return cached
+        
+        text = self.generate_text(prompt)
+        self.cache_store(kind, q_embed, text)
+        return text
 
-Include emergency warnings for serious symptoms.
-"""
-            response = GEN_MODEL.generate_content(prompt)
-            return response.text.strip() if response and response.text else f"Could not find information about {symptom_name}."
+    def cached_generate_stream(self, kind, query, prompt):
+        """Streaming cached_generate: yields text chunks and caches the full answer once complete"""
+        q_embed, cached = self.cached_lookup(kind, query)
+        if cached:
+            yield cached
+            return
+        
+        parts = []
+        for chunk in self.generate_text_stream(prompt):
+            parts.append(chunk)
+            yield chunk
+        self.cache_store(kind, q_embed, "".join(parts).strip())
+
+    def llm_answer(self, kind, query, prompt, not_found, error, stream=False):
+        """Cached Gemini answer, or a generator of chunks when `stream` is set; errors become the reply text"""
+        if stream:
+            return self._llm_answer_stream(kind, query, prompt, not_found, error)
+        try:
+            return self.cached_generate(kind, query, prompt) or ErrorReply(not_found)
         except Exception as e:
-            return f"Error retrieving symptom information: {e}"
+            return ErrorReply(f"{error}: {e}")
+
+    def _llm_answer_stream(self, kind, query, prompt, not_found, error):
+        try:
+            produced = False
+            for chunk in self.cached_generate_stream(kind, query, prompt):
+                produced = True
+                yield chunk
+            if not produced:
+                yield not_found
+        except Exception as e:
+            yield f"{error}: {e}"
 
     # -------------------------------
     # DETECT QUERY TYPE
     # -------------------------------
     def detect_query_type(self, query):
-        query_lower = query.lower()
-        
-        medication_keywords = ['medicine', 'medication', 'drug', 'pill', 'tablet', 'dose', 'dosage', 
-                              'side effect', 'prescription', 'ibuprofen', 'aspirin', 'paracetamol']
-        
-        condition_keywords = ['symptom', 'condition', 'disease', 'illness', 'diagnosis', 'treatment',
-                             'what is', 'have', 'suffering from', 'cancer', 'diabetes', 'asthma']
-        
-        symptom_keywords = ['pain', 'headache', 'fever', 'cough', 'nausea', 'vomiting', 'dizziness',
-                           'rash', 'swelling', 'bleeding', 'shortness of breath']
-        
-        if any(keyword in query_lower for keyword in medication_keywords):
-            return "medication"
-        elif any(keyword in query_lower for keyword in condition_keywords):
-            return "condition"
-        elif any(keyword in query_lower for keyword in symptom_keywords):
-            return "symptom"
-        else:
-            return "general"
+        # Single pass over the query; the highest-priority category found wins
+        found = {KEYWORD_CATEGORIES[keyword] for keyword in QUERY_KEYWORD_PATTERN.findall(query.lower())}
+        return next((query_type for query_type in QUERY_TYPE_PRIORITY if query_type in found), "general")
 
     # -------------------------------
     # GENERATE SMART RESPONSE
     # -------------------------------
-    def generate_smart_response(self, query):
+    def generate_smart_response(self, query, stream=False):
         query_type = self.detect_query_type(query)
         
         if query_type == "medication":
             # Extract drug name
-            drug_name = self.extract_entity(query, ['about', 'information on', 'tell me about'])
-            return self.get_drug_info(drug_name or query)
+            drug_name = self.extract_entity(query, ENTITY_PREFIXES)
+            return self.get_drug_info(drug_name or query, stream)
         
         elif query_type == "condition":
             # Extract condition name
-            condition_name = self.extract_entity(query, ['about', 'information on', 'tell me about'])
-            return self.get_condition_info(condition_name or query)
+            condition_name = self.extract_entity(query, ENTITY_PREFIXES)
+            return self.get_condition_info(condition_name or query, stream)
         
         elif query_type == "symptom":
             # Extract symptom name
-            symptom_name = self.extract_entity(query, ['about', 'information on', 'tell me about'])
-            return self.get_symptom_info(symptom_name or query)
+            symptom_name = self.extract_entity(query, ENTITY_PREFIXES)
+            return self.get_symptom_info(symptom_name or query, stream)
         
         else:
             # General query - try semantic search first
             results = self.semantic_search(query, top_k=3)
-            if results:
+            if results and results[0]['score'] > SEMANTIC_MATCH_THRESHOLD:
                 # Use the best matching result
                 best_match = results[0]
                 if best_match['type'] == 'conditions':
@@ -333,21 +843,19 @@ Include emergency warnings for serious symptoms.
                     return self.format_symptom_response(best_match['data'])
             
             # Fallback to Gemini for general questions
-            try:
-                prompt = f"""
-Answer this medical question: "{query}"
+            prompt = build_prompt("general", query)
+            return self.llm_answer("general", query, prompt, "I couldn't generate a response for that question.",
+                                   "Error generating response", stream)
 
-Provide accurate, helpful information with appropriate safety disclaimers.
-Always recommend consulting healthcare professionals for personal medical advice.
-"""
-                response = GEN_MODEL.generate_content(prompt)
-                return response.text.strip() if response and response.text else "I couldn't generate a response for that question."
-            except Exception as e:
-                return f"Error generating response: {e}"
+    def generate_smart_response_stream(self, query):
+        """Like generate_smart_response, but yields Gemini answers in chunks as they arrive"""
+        response = self.generate_smart_response(query, stream=True)
+        if isinstance(response, str):
+            yield response
+        else:
+            yield from response
 
     def extract_entity(self, query, keywords):
         query_lower = query.lower()
-        for keyword in keywords:
-            if keyword in query_lower:
-                return query_lower.split(keyword)[-1].strip()
-        return query
\ No newline at end of file
+        return next((query_lower.rsplit(keyword, 1)[-1].strip()
+                     for keyword in keywords if keyword in query_lower), query)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Static HTML/CSS fragments for the Streamlit front end"""
+
+CSS = """
+<style>
+.main-header {
+    font-size: 2.5rem;
+    color: #1f77b4;
+    text-align: center;
+    margin-bottom: 2rem;
+}
+.disclaimer {
+    background-color: #fff3cd;
+    border-left: 5px solid #ffc107;
+    padding: 10px;
+    margin: 10px 0;
+    border-radius: 5px;
+}
+.emergency-warning {
+    background-color: #f8d7da;
+    border-left: 5px solid #dc3545;
+    padding: 10px;
+    margin: 10px 0;
+    border-radius: 5px;
+    font-weight: bold;
+}
+.feature-card {
+    background-color: #f8f9fa;
+    padding: 15px;
+    border-radius: 10px;
+    margin: 10px 0;
+    border: 1px solid #dee2e6;
+}
+.quick-button {
+    width: 100%;
+    margin: 2px 0;
+}
+</style>
+"""
+
+HEADER_HTML = '<div class="main-header">🏥 Medical Information Assistant</div>'
+
+DISCLAIMER_HTML = """
+<div class="disclaimer">
+⚠️ <strong>Important Disclaimer:</strong> This application provides general medical information for educational purposes only. 
+It is not a substitute for professional medical advice, diagnosis, or treatment. Always seek the advice of your physician or 
+other qualified health provider with any questions you may have regarding a medical condition.
+</div>
+"""
+
+EMERGENCY_WARNING_HTML = """
+<div class="emergency-warning">
+🚨 For medical emergencies, call your local emergency number immediately! Do not rely on this application for emergency situations.
+</div>
+"""
+
+FEATURE_CARDS_HTML = """
+<div class="feature-card">
+<strong>💊 Medications Database</strong><br>
+Drug information, side effects, dosages, interactions
+</div>
+<div class="feature-card">
+<strong>🩺 Conditions Database</strong><br>
+Diseases, symptoms, treatments, prevention
+</div>
+<div class="feature-card">
+<strong>🔍 Symptoms Database</strong><br>
+Symptom analysis, possible causes, severity
+</div>
+<div class="feature-card">
+<strong>💡 Solutions Database</strong><br>
+First aid, home remedies, self-care
+</div>
+"""
+
+EXAMPLE_QUESTIONS_MD = """
+Try asking:
+- *"What is diabetes?"*
+- *"Side effects of aspirin"*
+- *"Headache symptoms and causes"*
+- *"Treatment for common cold"*
+- *"Can I take ibuprofen with blood pressure meds?"*
+"""